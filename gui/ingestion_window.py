@@ -0,0 +1,49 @@
+from PyQt6 import QtWidgets, QtGui, QtCore
+import os
+
+class IngestionWindow(QtWidgets.QWidget):
+    def __init__(self, service, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle('Plan Ingestion Queue')
+        self.resize(700, 400)
+        self.setWindowIcon(QtGui.QIcon('assets/wpi_logo.ico'))
+        self.service = service
+
+        self.setup_ui()
+
+        self.setStyleSheet('''
+            QWidget { background-color: #2b2b2b; color: #ffffff; font-family: 'Segoe UI', Arial, sans-serif; font-size: 10pt; }
+            QTableWidget { background-color: #3c3c3c; color: #ffffff; border: 1px solid #555555; border-radius: 4px; gridline-color: #555555; }
+            QTableWidget::item { padding: 4px; }
+            QHeaderView::section { background-color: #3c3c3c; color: #ffffff; border: 1px solid #555555; padding: 4px; }
+            QLabel { color: #ffffff; }
+        ''')
+
+        self.timer = QtCore.QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(1000)
+        self.refresh()
+
+    def setup_ui(self):
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.setSpacing(10)
+        layout.setContentsMargins(20, 20, 20, 20)
+
+        self.folder_label = QtWidgets.QLabel(f'Watching: {os.path.abspath(self.service.plans_dir)}')
+        layout.addWidget(self.folder_label)
+
+        self.table = QtWidgets.QTableWidget(0, 3)
+        self.table.setHorizontalHeaderLabels(['Plan', 'Status', 'Details'])
+        self.table.horizontalHeader().setSectionResizeMode(0, QtWidgets.QHeaderView.ResizeMode.Stretch)  # type: ignore
+        self.table.verticalHeader().setVisible(False)  # type: ignore
+        self.table.setEditTriggers(QtWidgets.QAbstractItemView.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+    def refresh(self):
+        status = self.service.status()
+        self.table.setRowCount(len(status))
+        for row, pdf_path in enumerate(sorted(status)):
+            state, detail = status[pdf_path]
+            self.table.setItem(row, 0, QtWidgets.QTableWidgetItem(os.path.basename(pdf_path)))
+            self.table.setItem(row, 1, QtWidgets.QTableWidgetItem(state))
+            self.table.setItem(row, 2, QtWidgets.QTableWidgetItem(detail))
@@ -2,10 +2,44 @@ from PyQt6 import QtWidgets, QtGui, QtCore
 import os
 import json
 import shutil
-from logic.search_engine import search_pdf_for_terms, semantic_search_pdf
-from logic.term_loader import load_terms
+import sqlite3
+from logic.search_engine import search_pdf_with_snippets, page_snippets, semantic_search_pdf
+from logic.term_loader import load_terms, terms_version
+from logic.ingestion import IngestionService
+from logic.fts_store import FtsStore
+from logic.document_cache import get_document
+from logic.preprocessing import normalize_term_sets
+from logic.report import generate_report, write_csv, write_html
+from logic.settings import USER_DATA_DIR
 from gui.reader_window import ReaderWindow
 from gui.term_editor_window import TermEditorWindow
+from gui.ingestion_window import IngestionWindow
+
+class ReportWorker(QtCore.QThread):
+    """Builds the cross-plan report off the GUI thread."""
+    succeeded = QtCore.pyqtSignal(dict)
+    failed = QtCore.pyqtSignal(str)
+
+    def __init__(self, files, terms, base, use_fuzzy, threshold, use_preprocessing, version, parent=None):
+        super().__init__(parent)
+        self.files = files
+        self.terms = terms
+        self.base = base
+        self.use_fuzzy = use_fuzzy
+        self.threshold = threshold
+        self.use_preprocessing = use_preprocessing
+        self.version = version
+
+    def run(self):
+        try:
+            report, failures = generate_report(self.files, self.terms, self.use_fuzzy, self.threshold,
+                                               self.use_preprocessing, version=self.version)
+            write_html(report, self.terms, self.base + '.html', failures)
+            write_csv(report, self.terms, self.base + '.csv')
+        except Exception as e:
+            self.failed.emit(str(e) or type(e).__name__)
+            return
+        self.succeeded.emit(failures)
 
 class MainWindow(QtWidgets.QMainWindow):
     def __init__(self):
@@ -16,9 +50,13 @@ class MainWindow(QtWidgets.QMainWindow):
         self.terms = {}
         self.selected_file = None
         self.results = {}
+        self.snippets = {}
+        self.fts_store = None
+        self.report_worker = None
+        self.close_after_report = False
 
         # User data directory
-        self.user_dir = os.path.join(os.path.expanduser("~"), "AppData", "Roaming", "EV-Search-Tool")
+        self.user_dir = USER_DATA_DIR
         os.makedirs(self.user_dir, exist_ok=True)
         self.config_path = os.path.join(self.user_dir, "config.json")
         self.terms_path = os.path.join(self.user_dir, "terms.json")
@@ -28,6 +66,10 @@ class MainWindow(QtWidgets.QMainWindow):
         self.load_terms_file()
         self.apply_config()
 
+        # Warm the document cache for plans dropped into the plans folder
+        self.ingestion = IngestionService(os.path.abspath('plans'))
+        self.ingestion.start()
+
         self.setStyleSheet('''
             QMainWindow { background-color: #2b2b2b; color: #ffffff; font-family: 'Segoe UI', Arial, sans-serif; font-size: 10pt; }
             QMenuBar { background-color: #3c3c3c; color: #ffffff; border-bottom: 1px solid #555555; }
@@ -75,6 +117,12 @@ class MainWindow(QtWidgets.QMainWindow):
         edit_action = QtGui.QAction('Edit Terms', self)
         edit_action.triggered.connect(self.open_terms_editor)
         tools_menu.addAction(edit_action)  # type: ignore
+        queue_action = QtGui.QAction('Ingestion Queue', self)
+        queue_action.triggered.connect(self.open_ingestion_queue)
+        tools_menu.addAction(queue_action)  # type: ignore
+        self.report_action = QtGui.QAction('Cross-Plan Report', self)
+        self.report_action.triggered.connect(self.generate_comparison_report)
+        tools_menu.addAction(self.report_action)  # type: ignore
 
         # Top section: Configuration
         config_group = QtWidgets.QGroupBox('Search Configuration')
@@ -137,6 +185,11 @@ class MainWindow(QtWidgets.QMainWindow):
         self.preprocessing_checkbox = QtWidgets.QCheckBox('Enable NLP Preprocessing')
         self.preprocessing_checkbox.setToolTip('Enable NLP preprocessing: lemmatization and stop-word removal for better text matching.')
         config_layout.addWidget(self.preprocessing_checkbox)
+
+        # Persisted SQLite full-text index
+        self.database_checkbox = QtWidgets.QCheckBox('Use Indexed Database (Exact mode)')
+        self.database_checkbox.setToolTip('Search a persistent SQLite full-text index of the plan instead of scanning its pages.\nResults are ranked by relevance. Only available in Exact mode.')
+        config_layout.addWidget(self.database_checkbox)
         
         # Connect mode change
         self.exact_radio.toggled.connect(self.on_mode_changed)
@@ -159,8 +212,13 @@ class MainWindow(QtWidgets.QMainWindow):
         results_layout = QtWidgets.QVBoxLayout(results_group)
         self.results_label = QtWidgets.QLabel('No search performed yet.')
         results_layout.addWidget(self.results_label)
+        self.snippet_list = QtWidgets.QListWidget()
+        self.snippet_list.setWordWrap(True)
+        self.snippet_list.setToolTip('Double-click a snippet to open its page in the reader.')
+        self.snippet_list.itemDoubleClicked.connect(self.open_snippet_page)
+        results_layout.addWidget(self.snippet_list)
         self.view_button = QtWidgets.QPushButton('View Results')
-        self.view_button.clicked.connect(self.view_results)
+        self.view_button.clicked.connect(lambda: self.view_results())
         self.view_button.setEnabled(False)
         results_layout.addWidget(self.view_button)
         layout.addWidget(results_group)
@@ -181,6 +239,7 @@ class MainWindow(QtWidgets.QMainWindow):
             if os.path.exists(bundled_terms):
                 shutil.copy(bundled_terms, self.terms_path)
         self.terms = load_terms(self.terms_path)
+        self.terms_version = terms_version(self.terms_path)
         self.category_combo.clear()
         self.category_combo.currentTextChanged.connect(self.update_questions)
         self.category_combo.addItems(self.terms.keys())
@@ -204,6 +263,68 @@ class MainWindow(QtWidgets.QMainWindow):
         editor.exec()
         self.load_terms_file()
 
+    def open_ingestion_queue(self):
+        self.ingestion_window = IngestionWindow(self.ingestion)
+        self.ingestion_window.show()
+
+    def generate_comparison_report(self):
+        files, _ = QtWidgets.QFileDialog.getOpenFileNames(self, 'Select Plans to Compare', 'plans', 'PDF Files (*.pdf)')
+        if not files:
+            return
+        out_path, _ = QtWidgets.QFileDialog.getSaveFileName(self, 'Save Report', os.path.join(self.user_dir, 'report.html'), 'HTML Files (*.html)')
+        if not out_path:
+            return
+        base = os.path.splitext(out_path)[0]
+
+        self.report_base = base
+        self.report_worker = ReportWorker(files, self.terms, base, self.fuzzy_radio.isChecked(), self.threshold_slider.value(),
+                                          self.preprocessing_checkbox.isChecked(), self.terms_version, self)
+        self.report_worker.succeeded.connect(self.on_report_finished)
+        self.report_worker.failed.connect(self.on_report_failed)
+        self.report_action.setEnabled(False)
+        self.statusBar().showMessage(f'Comparing {len(files)} plans...')  # type: ignore
+        self.report_worker.start()
+
+    def on_report_finished(self, failures):
+        self.report_action.setEnabled(True)
+        base = self.report_base
+        self.statusBar().showMessage(f'Report saved to {base}.html and {base}.csv')  # type: ignore
+        if failures:
+            details = '\n'.join(f'{os.path.basename(path)}: {error}' for path, error in failures.items())
+            QtWidgets.QMessageBox.warning(self, 'Some Plans Failed', f'These plans could not be processed and were left out of the report:\n\n{details}')
+        QtGui.QDesktopServices.openUrl(QtCore.QUrl.fromLocalFile(base + '.html'))
+        self.close_if_requested()
+
+    def on_report_failed(self, error):
+        self.report_action.setEnabled(True)
+        self.statusBar().showMessage('Report failed.')  # type: ignore
+        QtWidgets.QMessageBox.critical(self, 'Report Failed', f'The cross-plan report could not be generated:\n\n{error}')
+        self.close_if_requested()
+
+    def close_if_requested(self):
+        if self.close_after_report:
+            # The signal is the worker's last act, so this returns at once and
+            # closeEvent no longer sees a running report
+            self.report_worker.wait()
+            self.close()
+
+    def closeEvent(self, event):
+        if self.report_worker is not None and self.report_worker.isRunning():
+            # Waiting on the worker here would freeze the window, so keep it open
+            # and close once the report's succeeded/failed signal arrives
+            event.ignore()
+            if self.close_after_report:
+                return
+            reply = QtWidgets.QMessageBox.question(self, 'Report in Progress', 'A cross-plan report is still being generated. Close the application once it has finished?')
+            if reply == QtWidgets.QMessageBox.StandardButton.Yes:
+                self.close_after_report = True
+                self.statusBar().showMessage('Closing once the cross-plan report has finished...')  # type: ignore
+            return
+        self.ingestion.stop()
+        if self.fts_store is not None:
+            self.fts_store.close()
+        super().closeEvent(event)
+
     def run_search(self):
         if not self.selected_file:
             QtWidgets.QMessageBox.warning(self, 'No File', 'Please load a PDF file.')
@@ -226,10 +347,23 @@ class MainWindow(QtWidgets.QMainWindow):
         self.mode = mode
         self.threshold = threshold
         
-        if self.exact_radio.isChecked():
-            self.results = search_pdf_for_terms(self.selected_file, term_sets, False, 80, use_preprocessing)
+        if self.exact_radio.isChecked() and self.database_checkbox.isChecked():
+            try:
+                self.results, self.snippets = self.search_database(term_sets, use_preprocessing)
+            except sqlite3.Error as e:
+                # The database is optional; turn it off and scan the plan instead
+                self.database_checkbox.setChecked(False)
+                QtWidgets.QMessageBox.warning(self, 'Indexed Database Unavailable', f'The indexed database could not be used, so the plan was searched directly instead.\n\n{e}')
+                self.results, self.snippets = search_pdf_with_snippets(self.selected_file, term_sets, False, 80, use_preprocessing,
+                                                                       terms_version=self.terms_version)
+        elif self.exact_radio.isChecked():
+            self.results, self.snippets = search_pdf_with_snippets(self.selected_file, term_sets, False, 80, use_preprocessing,
+                                                                   terms_version=self.terms_version)
         elif self.fuzzy_radio.isChecked():
-            self.results = search_pdf_for_terms(self.selected_file, term_sets, True, threshold, use_preprocessing)
+            self.results, self.snippets = search_pdf_with_snippets(self.selected_file, term_sets, True, threshold, use_preprocessing,
+                                                                   terms_version=self.terms_version)
+
+        self.populate_snippets()
 
         if not self.results:
             self.results_label.setText('No matches found.')
@@ -242,12 +376,42 @@ class MainWindow(QtWidgets.QMainWindow):
         self.statusBar().showMessage(f'Search completed. Found matches on {len(self.results)} pages.')  # type: ignore
         self.save_config()
 
-    def view_results(self):
+    def search_database(self, term_sets, use_preprocessing):
+        # Like the in-memory search, results map page -> searched text and snippets
+        # come from the raw page; both dicts are filled in bm25 rank order.
+        if self.fts_store is None:
+            self.fts_store = FtsStore()
+        self.fts_store.add_plan(self.selected_file)
+        document = get_document(self.selected_file, use_preprocessing)
+        pages = document['preprocessed'] if use_preprocessing else document['pages']
+        normalized = normalize_term_sets(term_sets, self.terms_version) if use_preprocessing else None
+        results = {}
+        snippets = {}
+        for _, page, _, _ in self.fts_store.search(term_sets, self.selected_file, use_preprocessing,
+                                                   terms_version=self.terms_version):
+            results[page] = pages[page]
+            snippets[page] = page_snippets(document, page, term_sets, normalized=normalized)
+        return results, snippets
+
+    def populate_snippets(self):
+        # Keep the order the search produced (page order, or rank for the database)
+        self.snippet_list.clear()
+        for page_num, page_snippet_list in self.snippets.items():
+            for snippet in page_snippet_list:
+                item = QtWidgets.QListWidgetItem(f'Page {page_num + 1}: {snippet}')
+                item.setData(QtCore.Qt.ItemDataRole.UserRole, page_num)
+                self.snippet_list.addItem(item)
+
+    def open_snippet_page(self, item):
+        self.view_results(start_page=item.data(QtCore.Qt.ItemDataRole.UserRole))
+
+    def view_results(self, start_page=None):
         if self.results:
             category = self.category_combo.currentText()
             question = self.question_list.currentItem().text()  # type: ignore
             term_sets = self.terms[category][question]
-            self.reader = ReaderWindow(self.selected_file, list(self.results.keys()), term_sets, self.mode, self.threshold)
+            self.reader = ReaderWindow(self.selected_file, list(self.results.keys()), term_sets, self.mode, self.threshold,
+                                       start_page=start_page)
             self.reader.show()
 
     def load_config(self):
@@ -270,6 +434,8 @@ class MainWindow(QtWidgets.QMainWindow):
             self.threshold_slider.setValue(self.config['threshold'])
         if 'preprocessing' in self.config:
             self.preprocessing_checkbox.setChecked(self.config['preprocessing'])
+        if 'use_database' in self.config:
+            self.database_checkbox.setChecked(self.config['use_database'])
         self.on_mode_changed()  # Update slider enabled state
 
     def save_config(self):
@@ -278,7 +444,8 @@ class MainWindow(QtWidgets.QMainWindow):
             'selected_question': self.question_list.currentItem().text() if self.question_list.currentItem() else '',  # type: ignore
             'search_mode': 'exact' if self.exact_radio.isChecked() else 'fuzzy',
             'threshold': self.threshold_slider.value(),
-            'preprocessing': self.preprocessing_checkbox.isChecked()
+            'preprocessing': self.preprocessing_checkbox.isChecked(),
+            'use_database': self.database_checkbox.isChecked()
         }
         with open(self.config_path, 'w') as f:
             json.dump(config, f, indent=2)
@@ -288,3 +455,4 @@ class MainWindow(QtWidgets.QMainWindow):
             self.threshold_slider.setEnabled(True)
         else:
             self.threshold_slider.setEnabled(False)
+        self.database_checkbox.setEnabled(self.exact_radio.isChecked())
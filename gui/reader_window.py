@@ -1,10 +1,11 @@
 from PyQt6 import QtWidgets, QtGui, QtCore
-import fitz  # PyMuPDF
 import re
 from thefuzz import fuzz
 
+from logic.document_cache import get_pages
+
 class ReaderWindow(QtWidgets.QWidget):
-    def __init__(self, pdf_path, matched_pages, term_sets, mode='exact', threshold=80, parent=None):
+    def __init__(self, pdf_path, matched_pages, term_sets, mode='exact', threshold=80, start_page=None, parent=None):
         super().__init__(parent)
         self.setWindowTitle('PDF Viewer - Highlighted Matches')
         self.resize(1000, 700)
@@ -15,9 +16,10 @@ class ReaderWindow(QtWidgets.QWidget):
         self.term_sets = term_sets
         self.mode = mode
         self.threshold = threshold
-        self.current_index = 0
+        self.current_index = matched_pages.index(start_page) if start_page in matched_pages else 0
 
-        self.doc = fitz.open(self.pdf_path)
+        # Cached page text, including OCR output for scanned pages
+        self.pages = get_pages(self.pdf_path)
 
         self.setup_ui()
 
@@ -75,8 +77,7 @@ class ReaderWindow(QtWidgets.QWidget):
             return
 
         page_num = self.matched_pages[self.current_index]
-        page = self.doc.load_page(page_num)
-        text = page.get_text() or ""
+        text = self.pages[page_num]
 
         self.highlight_text(text, self.term_sets)
         self.page_label.setText(f'Page: {page_num + 1}')
@@ -0,0 +1,293 @@
+import fitz  # PyMuPDF
+import functools
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from logic.preprocessing import nlp, preprocess_pages, tokenize
+from logic.settings import USER_DATA_DIR
+
+CACHE_DIR = os.path.join(USER_DATA_DIR, "cache")
+OCR_CACHE_DIR = os.path.join(CACHE_DIR, "ocr")
+CACHE_VERSION = 5
+MAX_DOCUMENTS_IN_MEMORY = 8
+OCR_LANGUAGE = "eng"
+OCR_WORKERS = 4
+
+# The in-memory memos are shared by the GUI thread and the ingestion watcher
+_memo_lock = threading.Lock()
+_hash_memo = {}
+_documents = {}
+
+def _preprocessor():
+    return 'spacy' if nlp is not None else 'lower'
+
+def cache_signature():
+    """Identifies what a freshly built cache entry would contain besides the PDF itself.
+
+    Stores derived from the cache (like the FTS index) keep this next to the
+    file hash and rebuild when it changes, e.g. once Tesseract is installed.
+    """
+    return f"{CACHE_VERSION}/{_preprocessor()}/{'ocr' if ocr_available() else 'no-ocr'}"
+
+def file_hash(pdf_path):
+    """Content hash of a PDF, memoized on path, mtime and size."""
+    stat = os.stat(pdf_path)
+    key = (os.path.abspath(pdf_path), stat.st_mtime_ns, stat.st_size)
+    with _memo_lock:
+        if key in _hash_memo:
+            return _hash_memo[key]
+    digest = hashlib.sha256()
+    with open(pdf_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    with _memo_lock:
+        _hash_memo[key] = digest.hexdigest()
+        return _hash_memo[key]
+
+@functools.lru_cache(maxsize=None)
+def ocr_available():
+    """Whether PyMuPDF can find a local Tesseract installation."""
+    try:
+        return bool(fitz.get_tessdata())
+    except (AttributeError, RuntimeError):
+        return bool(os.environ.get("TESSDATA_PREFIX"))
+
+def page_hash(doc, page):
+    """Hash of a page's content streams and images, so identical scans share OCR output."""
+    digest = hashlib.sha256(page.read_contents())
+    for image in page.get_images(full=True):
+        digest.update(doc.xref_stream_raw(image[0]) or b'')
+    return digest.hexdigest()
+
+def needs_ocr(page, text):
+    return not text.strip() and bool(page.get_images())
+
+def ocr_page(pdf_path, page_number):
+    """Worker entry point: OCR one page with Tesseract and return its text."""
+    doc = fitz.open(pdf_path)
+    try:
+        page = doc.load_page(page_number)
+        textpage = page.get_textpage_ocr(language=OCR_LANGUAGE, dpi=300, full=True)
+        return page.get_text(textpage=textpage) or ""
+    finally:
+        doc.close()
+
+def _ocr_cache_file(digest):
+    return os.path.join(OCR_CACHE_DIR, f"{digest}.txt")
+
+def _read_ocr(digest):
+    try:
+        with open(_ocr_cache_file(digest), 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write_ocr(digest, text):
+    os.makedirs(OCR_CACHE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=OCR_CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, _ocr_cache_file(digest))
+
+def _ocr_missing_pages(pdf_path, missing):
+    """Fill in text for image-only pages, from the OCR cache or Tesseract.
+
+    ``missing`` maps page numbers to page hashes; returns page number -> text.
+    Pages are OCR'd in a small pool when called from the main process, and one
+    after another when already inside an ingestion or report worker.
+    """
+    texts = {}
+    pending = {}
+    for page_number, digest in missing.items():
+        cached = _read_ocr(digest)
+        if cached is not None:
+            texts[page_number] = cached
+        else:
+            pending[page_number] = digest
+    if not pending:
+        return texts
+
+    executor = None
+    if multiprocessing.parent_process() is None:
+        executor = ProcessPoolExecutor(max_workers=min(OCR_WORKERS, len(pending)))
+        results = {page_number: executor.submit(ocr_page, pdf_path, page_number).result for page_number in pending}
+    else:
+        # The worker's own pool already bounds the parallelism; a nested pool
+        # per plan would put up to OCR_WORKERS more processes on every core
+        results = {page_number: functools.partial(ocr_page, pdf_path, page_number) for page_number in pending}
+    try:
+        for page_number, result in results.items():
+            try:
+                text = result()
+            except Exception as e:
+                # Tesseract (or the page's image data) failed; leave the page empty
+                # rather than failing the whole plan, and say which one it was
+                print(f"OCR failed on page {page_number + 1} of {pdf_path}: {e}", file=sys.stderr)
+                continue
+            _write_ocr(pending[page_number], text)
+            texts[page_number] = text
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return texts
+
+def split_words(text):
+    """Whitespace-split words, the vocabulary fuzzy matching compares terms against."""
+    return text.lower().split()
+
+def build_index(pages, tokenizer=tokenize):
+    index = {}
+    for i, text in enumerate(pages):
+        for word in set(tokenizer(text)):
+            index.setdefault(word, []).append(i)
+    return index
+
+def _cache_file(digest):
+    return os.path.join(CACHE_DIR, f"{digest}.json")
+
+def _remember(digest, document):
+    with _memo_lock:
+        if len(_documents) >= MAX_DOCUMENTS_IN_MEMORY and digest not in _documents:
+            _documents.pop(next(iter(_documents)))
+        _documents[digest] = document
+
+def _write_document(digest, document):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    # Write to a temp file and swap it in so concurrent readers and ingestion
+    # workers never see a partially written cache entry.
+    fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        json.dump(document, f)
+    os.replace(tmp_path, _cache_file(digest))
+
+def load_document(pdf_path):
+    digest = file_hash(pdf_path)
+    with _memo_lock:
+        if digest in _documents:
+            return _documents[digest]
+    path = _cache_file(digest)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            document = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if document.get('version') != CACHE_VERSION or document.get('preprocessor') != _preprocessor():
+        return None
+    if ocr_available() and not document.get('ocr'):
+        # Built before Tesseract was installed; rebuild so scanned pages get text
+        return None
+    _remember(digest, document)
+    return document
+
+def _add_preprocessed(document):
+    preprocessed = list(preprocess_pages(document['pages']))
+    document['preprocessed'] = [text for text, _ in preprocessed]
+    # Each page's lemma sequence, plus where every lemma sits in the raw page so
+    # snippets for lemma matches need no second pass through spaCy
+    document['preprocessed_tokens'] = [[lemma for lemma, _, _ in tokens] for _, tokens in preprocessed]
+    document['preprocessed_offsets'] = [[[start, end] for _, start, end in tokens] for _, tokens in preprocessed]
+    document['preprocessed_index'] = build_index(document['preprocessed'])
+    document['preprocessed_fuzzy_index'] = build_index(document['preprocessed'], split_words)
+
+def build_document(pdf_path, preprocess=True):
+    """Extract page text from a PDF, build its artifacts and store them in the cache."""
+    digest = file_hash(pdf_path)
+    use_ocr = ocr_available()
+    pages = []
+    missing = {}
+    doc = fitz.open(pdf_path)
+    for i in range(len(doc)):
+        page = doc.load_page(i)
+        text = page.get_text() or ""
+        if use_ocr and needs_ocr(page, text):
+            missing[i] = page_hash(doc, page)
+        pages.append(text)
+    doc.close()
+
+    ocr_texts = _ocr_missing_pages(pdf_path, missing) if missing else {}
+    for i, text in ocr_texts.items():
+        pages[i] = text
+
+    document = {
+        'version': CACHE_VERSION,
+        'preprocessor': _preprocessor(),
+        'ocr': use_ocr,
+        'ocr_pages': sorted(ocr_texts),
+        'hash': digest,
+        'pages': pages,
+        'index': build_index(pages),
+        'fuzzy_index': build_index(pages, split_words),
+    }
+    if preprocess:
+        _add_preprocessed(document)
+    _write_document(digest, document)
+    _remember(digest, document)
+    return document
+
+def get_document(pdf_path, use_preprocessing=False):
+    document = load_document(pdf_path)
+    if document is None:
+        return build_document(pdf_path, preprocess=use_preprocessing)
+    if use_preprocessing and 'preprocessed' not in document:
+        _add_preprocessed(document)
+        _write_document(document['hash'], document)
+    return document
+
+def get_pages(pdf_path, use_preprocessing=False):
+    document = get_document(pdf_path, use_preprocessing)
+    return document['preprocessed'] if use_preprocessing else document['pages']
+
+def candidate_pages(pdf_path, term_sets, use_preprocessing=False):
+    """Pages that can possibly satisfy every group, based on the cached word index.
+
+    Every word of a term has to appear on a page for the term to match there,
+    so this is a superset of the exact-match results.
+    """
+    document = get_document(pdf_path, use_preprocessing)
+    index = document['preprocessed_index' if use_preprocessing else 'index']
+    candidates = set(range(len(document['pages'])))
+    for group in term_sets:
+        group_pages = set()
+        for term in group:
+            if term.strip() == "":
+                continue
+            words = tokenize(term)
+            if not words:
+                group_pages = set(range(len(document['pages'])))
+                break
+            term_pages = set(index.get(words[0], ()))
+            for word in words[1:]:
+                term_pages &= set(index.get(word, ()))
+            group_pages |= term_pages
+        candidates &= group_pages
+    return candidates
+
+def _contains_phrase(tokens, lemmas):
+    first, n = lemmas[0], len(lemmas)
+    return any(token == first and tuple(tokens[j:j + n]) == lemmas for j, token in enumerate(tokens))
+
+def lemma_pages(document, lemmas):
+    """Pages whose preprocessed text contains a normalized term.
+
+    Single-lemma terms are pure set lookups in the lemma index. For phrases the
+    index narrows the pages down and each page's stored lemma sequence confirms
+    the lemmas appear consecutively.
+    """
+    if not lemmas:
+        return set()
+    index = document['preprocessed_index']
+    pages = set(index.get(lemmas[0], ()))
+    for lemma in lemmas[1:]:
+        pages &= set(index.get(lemma, ()))
+    if len(lemmas) > 1:
+        tokens = document['preprocessed_tokens']
+        pages = {i for i in pages if _contains_phrase(tokens[i], tuple(lemmas))}
+    return pages
@@ -0,0 +1,193 @@
+import argparse
+import os
+import sqlite3
+import sys
+
+from logic.document_cache import cache_signature, file_hash, get_document
+from logic.preprocessing import normalize_term_sets
+from logic.settings import USER_DATA_DIR
+from logic.term_loader import load_terms, terms_version
+
+DB_PATH = os.path.join(USER_DATA_DIR, "plans.db")
+
+SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS plans (
+        id INTEGER PRIMARY KEY,
+        path TEXT UNIQUE NOT NULL,
+        hash TEXT NOT NULL,
+        page_count INTEGER NOT NULL,
+        cache_signature TEXT NOT NULL DEFAULT ''
+    );
+    CREATE VIRTUAL TABLE IF NOT EXISTS pages USING fts5(
+        text, preprocessed, plan_id UNINDEXED, page UNINDEXED
+    );
+'''
+
+def _quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+def build_match_query(term_sets, use_preprocessing=False, terms_version=None):
+    """Translate a question's term groups into an FTS5 MATCH expression.
+
+    Terms within a group are OR-ed, groups are AND-ed, and every term is quoted
+    so multi-word terms are matched as phrases. With preprocessing the terms are
+    lemmatized first so they line up with the preprocessed column. Returns None
+    when some group has no usable terms, since such a question can never match.
+    """
+    if use_preprocessing:
+        term_sets = [[' '.join(lemmas) for lemmas in group]
+                     for group in normalize_term_sets(term_sets, terms_version)]
+    groups = []
+    for group in term_sets:
+        terms = [_quote(term.strip()) for term in group if term.strip()]
+        if not terms:
+            return None
+        groups.append('(' + ' OR '.join(terms) + ')')
+    if not groups:
+        return None
+    column = 'preprocessed' if use_preprocessing else 'text'
+    return f"{column} : ({' AND '.join(groups)})"
+
+class FtsStore:
+    """Disk-backed full-text index of plan pages using SQLite FTS5."""
+
+    def __init__(self, db_path=DB_PATH):
+        if db_path != ':memory:':
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(db_path, timeout=30)
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute('PRAGMA table_info(plans)')]
+        if 'cache_signature' not in columns:
+            # Databases created before the signature existed; their plans get re-indexed
+            self.conn.execute("ALTER TABLE plans ADD COLUMN cache_signature TEXT NOT NULL DEFAULT ''")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def add_plan(self, pdf_path):
+        """Index a plan's pages, skipping it if the stored copy is already current.
+
+        A plan is re-indexed when the PDF changes and also when the document
+        cache would now produce different text for it (new cache version,
+        preprocessor, or OCR becoming available).
+        """
+        pdf_path = os.path.abspath(pdf_path)
+        digest = file_hash(pdf_path)
+        signature = cache_signature()
+        row = self.conn.execute('SELECT id, hash, cache_signature FROM plans WHERE path = ?', (pdf_path,)).fetchone()
+        if row and row[1] == digest and row[2] == signature:
+            return False
+
+        document = get_document(pdf_path, use_preprocessing=True)
+        with self.conn:
+            if row:
+                plan_id = row[0]
+                self.conn.execute('DELETE FROM pages WHERE plan_id = ?', (plan_id,))
+                self.conn.execute('UPDATE plans SET hash = ?, page_count = ?, cache_signature = ? WHERE id = ?',
+                                  (digest, len(document['pages']), signature, plan_id))
+            else:
+                plan_id = self.conn.execute(
+                    'INSERT INTO plans (path, hash, page_count, cache_signature) VALUES (?, ?, ?, ?)',
+                    (pdf_path, digest, len(document['pages']), signature)).lastrowid
+            self.conn.executemany(
+                'INSERT INTO pages (text, preprocessed, plan_id, page) VALUES (?, ?, ?, ?)',
+                [(text, preprocessed, plan_id, i)
+                 for i, (text, preprocessed) in enumerate(zip(document['pages'], document['preprocessed']))])
+        return True
+
+    def remove_plan(self, pdf_path):
+        pdf_path = os.path.abspath(pdf_path)
+        with self.conn:
+            row = self.conn.execute('SELECT id FROM plans WHERE path = ?', (pdf_path,)).fetchone()
+            if row:
+                self.conn.execute('DELETE FROM pages WHERE plan_id = ?', (row[0],))
+                self.conn.execute('DELETE FROM plans WHERE id = ?', (row[0],))
+        return row is not None
+
+    def prune_missing(self):
+        """Drop plans whose PDF no longer exists on disk and return their paths."""
+        missing = [path for path in self.plans() if not os.path.exists(path)]
+        for path in missing:
+            self.remove_plan(path)
+        return missing
+
+    def plans(self):
+        return [path for (path,) in self.conn.execute('SELECT path FROM plans ORDER BY path')]
+
+    def search(self, term_sets, pdf_path=None, use_preprocessing=False, limit=None, snippet_tokens=16,
+               terms_version=None):
+        """Return (plan path, page number, score, snippet) rows, best matches first."""
+        query = build_match_query(term_sets, use_preprocessing, terms_version)
+        if query is None:
+            return []
+        # Snippets always come from the raw text column, even when matching ran
+        # against the lemmatized one
+        sql = f'''
+            SELECT plans.path, pages.page, bm25(pages),
+                   snippet(pages, 0, '', '', '…', {int(snippet_tokens)})
+            FROM pages JOIN plans ON plans.id = pages.plan_id
+            WHERE pages MATCH ?
+        '''
+        params = [query]
+        if pdf_path is not None:
+            sql += ' AND plans.path = ?'
+            params.append(os.path.abspath(pdf_path))
+        sql += ' ORDER BY bm25(pages)'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        # bm25() is lower-is-better; flip it so callers get higher-is-better scores
+        return [(path, page, -score, snippet)
+                for path, page, score, snippet in self.conn.execute(sql, params)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Index plans into SQLite FTS5 and search them headlessly.')
+    parser.add_argument('--db', default=DB_PATH, help='Path to the SQLite database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = subparsers.add_parser('index', help='Index one or more plan PDFs')
+    index_parser.add_argument('pdfs', nargs='+')
+
+    remove_parser = subparsers.add_parser('remove', help='Remove plans from the index')
+    remove_parser.add_argument('pdfs', nargs='+')
+
+    search_parser = subparsers.add_parser('search', help='Search indexed plans for a question')
+    search_parser.add_argument('--terms', default='data/terms.json', help='Terms JSON file')
+    search_parser.add_argument('--category', required=True)
+    search_parser.add_argument('--question', required=True)
+    search_parser.add_argument('--plan', help='Restrict results to one plan PDF')
+    search_parser.add_argument('--preprocessing', action='store_true', help='Match against preprocessed text')
+    search_parser.add_argument('--limit', type=int, default=20)
+
+    args = parser.parse_args(argv)
+    store = FtsStore(args.db)
+    try:
+        # Plans deleted or moved since they were indexed would otherwise keep
+        # turning up in search results
+        for pdf_path in store.prune_missing():
+            print(f"Removed missing plan: {pdf_path}")
+        if args.command == 'remove':
+            for pdf_path in args.pdfs:
+                removed = store.remove_plan(pdf_path)
+                print(f"{'Removed' if removed else 'Not indexed'}: {pdf_path}")
+        elif args.command == 'index':
+            for pdf_path in args.pdfs:
+                updated = store.add_plan(pdf_path)
+                print(f"{'Indexed' if updated else 'Up to date'}: {pdf_path}")
+        else:
+            terms = load_terms(args.terms)
+            try:
+                term_sets = terms[args.category][args.question]
+            except KeyError:
+                print('Unknown category or question.', file=sys.stderr)
+                return 1
+            for path, page, score, snippet in store.search(term_sets, args.plan, args.preprocessing, args.limit,
+                                                              terms_version=terms_version(args.terms)):
+                print(f"{os.path.basename(path)}\tpage {page + 1}\t{score:.2f}\t{snippet}")
+    finally:
+        store.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
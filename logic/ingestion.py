@@ -0,0 +1,141 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from logic.document_cache import get_document, load_document
+
+QUEUED = 'Queued'
+PROCESSING = 'Processing'
+READY = 'Ready'
+FAILED = 'Failed'
+
+def ingest_pdf(pdf_path):
+    """Worker entry point: build the cached artifacts for one plan and return its page count."""
+    # Cached entries that only lack the preprocessed fields get just those added
+    document = get_document(pdf_path, use_preprocessing=True)
+    return len(document['pages'])
+
+class IngestionService:
+    """Watches a plans folder and warms the document cache for new or modified PDFs.
+
+    PyMuPDF is not thread-safe, so extraction runs in a bounded pool of worker
+    processes while a lightweight thread polls the folder for changes.
+    """
+
+    def __init__(self, plans_dir, max_workers=2, poll_interval=2.0):
+        self.plans_dir = plans_dir
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self._executor = None
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._lock = threading.RLock()
+        self._seen = {}
+        self._status = {}
+        self._pending = deque()
+        self._in_flight = 0
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._thread = threading.Thread(target=self._watch, name='plan-ingestion', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop_event.set()
+        self._thread.join()
+        self._thread = None
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._pending.clear()
+        # shutdown() alone lets running builds (OCR included) finish, and the
+        # interpreter joins the pool at exit, so closing the app would hang until
+        # they are done. Stop them instead; cache writes are atomic, so a killed
+        # build leaves nothing half-written and is simply redone next time.
+        workers = list((executor._processes or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in workers:
+            process.terminate()
+
+    def status(self):
+        """Snapshot of {pdf_path: (state, detail)} for every plan seen so far."""
+        with self._lock:
+            return dict(self._status)
+
+    def _set_status(self, pdf_path, state, detail=''):
+        with self._lock:
+            self._status[pdf_path] = (state, detail)
+
+    def _watch(self):
+        while not self._stop_event.is_set():
+            self.scan()
+            self._stop_event.wait(self.poll_interval)
+
+    def scan(self):
+        """Queue every PDF in the plans folder that is new or changed since the last scan."""
+        if not os.path.isdir(self.plans_dir):
+            return
+        for name in sorted(os.listdir(self.plans_dir)):
+            if not name.lower().endswith('.pdf'):
+                continue
+            pdf_path = os.path.join(self.plans_dir, name)
+            try:
+                stat = os.stat(pdf_path)
+            except OSError:
+                continue
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if self._seen.get(pdf_path) == signature:
+                continue
+            self._seen[pdf_path] = signature
+            self._enqueue(pdf_path)
+
+        with self._lock:
+            for pdf_path in list(self._status):
+                if not os.path.exists(pdf_path):
+                    del self._status[pdf_path]
+                    self._seen.pop(pdf_path, None)
+                    if pdf_path in self._pending:
+                        self._pending.remove(pdf_path)
+
+    def _enqueue(self, pdf_path):
+        try:
+            document = load_document(pdf_path)
+        except OSError as e:
+            self._set_status(pdf_path, FAILED, str(e))
+            return
+        if document is not None and 'preprocessed' in document:
+            self._set_status(pdf_path, READY, f"{len(document['pages'])} pages (cached)")
+            return
+
+        with self._lock:
+            self._status[pdf_path] = (QUEUED, '')
+            self._pending.append(pdf_path)
+        self._dispatch()
+
+    def _dispatch(self):
+        # Only hand the pool as many plans as it has workers, so every submitted
+        # plan is actually being processed and the rest wait in our own queue.
+        with self._lock:
+            while self._pending and self._in_flight < self.max_workers and self._executor is not None:
+                pdf_path = self._pending.popleft()
+                self._in_flight += 1
+                self._status[pdf_path] = (PROCESSING, '')
+                future = self._executor.submit(ingest_pdf, pdf_path)
+                future.add_done_callback(lambda f, path=pdf_path: self._on_done(path, f))
+
+    def _on_done(self, pdf_path, future):
+        with self._lock:
+            self._in_flight -= 1
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            self._set_status(pdf_path, FAILED, str(error))
+        else:
+            self._set_status(pdf_path, READY, f"{future.result()} pages")
+        self._dispatch()
@@ -0,0 +1,69 @@
+import re
+
+try:
+    import spacy
+    nlp = spacy.load('en_core_web_sm')
+except (ImportError, OSError):
+    nlp = None
+
+_normalized_version = None
+_normalized_terms = {}
+
+def preprocess_pages(texts):
+    """Preprocess many texts in one batch, yielding (preprocessed text, tokens) per text.
+
+    Tokens are (lemma, start, end) for every word of the preprocessed text, with
+    start and end pointing at the raw word it came from, so matches found in the
+    preprocessed form can be mapped back onto the original text.
+    """
+    if nlp is None:
+        for text in texts:
+            lowered = text.lower()
+            yield lowered, [(m.group(), m.start(), m.end()) for m in re.finditer(r"\w+", lowered)]
+        return
+    for doc in nlp.pipe(text.lower() for text in texts):
+        kept = [token for token in doc if not token.is_stop and token.is_alpha]
+        tokens = [(lemma, token.idx, token.idx + len(token)) for token in kept for lemma in tokenize(token.lemma_)]
+        yield ' '.join([token.lemma_ for token in kept]), tokens
+
+def preprocess_text(text):
+    return next(preprocess_pages([text]))[0]
+
+def tokenize(text):
+    return re.findall(r"\w+", text.lower())
+
+def normalize_term(term):
+    """Run a search term through the same pipeline as page text, returning its lemmas."""
+    return tuple(tokenize(preprocess_text(term)))
+
+def normalize_term_sets(term_sets, version=None):
+    """Lemmatize each group's terms, reusing earlier results for the same terms file version.
+
+    Blank terms are dropped. A term made up only of stop words normalizes to an
+    empty tuple and can never match preprocessed text.
+    """
+    global _normalized_version
+    if version is not None and version != _normalized_version:
+        _normalized_terms.clear()
+        _normalized_version = version
+
+    normalized = []
+    for group in term_sets:
+        lemmas = []
+        for term in group:
+            if term.strip() == "":
+                continue
+            if term not in _normalized_terms:
+                _normalized_terms[term] = normalize_term(term)
+            lemmas.append(_normalized_terms[term])
+        normalized.append(lemmas)
+    return normalized
+
+def normalize_terms(terms, version=None):
+    """Normalize every term in a category/question tree: {term: lemmas}."""
+    normalized = {}
+    for questions in terms.values():
+        for term_sets in questions.values():
+            for group, lemmas in zip(term_sets, normalize_term_sets(term_sets, version)):
+                normalized.update(zip([term for term in group if term.strip()], lemmas))
+    return normalized
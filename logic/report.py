@@ -0,0 +1,200 @@
+import argparse
+import csv
+import html
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from thefuzz import fuzz
+
+from logic.document_cache import get_document, lemma_pages
+from logic.preprocessing import normalize_terms, tokenize
+from logic.search_engine import page_snippets
+from logic.term_loader import load_terms, terms_version
+
+TOP_PAGES = 3
+
+def _exact_term_pages(document, term):
+    words = tokenize(term)
+    if not words:
+        return set()
+    index = document['index']
+    pages = set(index.get(words[0], ()))
+    for word in words[1:]:
+        pages &= set(index.get(word, ()))
+    if words != [term.lower()] and pages:
+        # The index only says every word occurs on the page; confirm phrases and
+        # terms with punctuation the same way group_matches does
+        pattern = re.compile(r"\b" + re.escape(term) + r"\b", flags=re.IGNORECASE)
+        pages = {i for i in pages if pattern.search(document['pages'][i])}
+    return pages
+
+def _fuzzy_term_pages(document, term, use_preprocessing, threshold):
+    # Same whitespace-split vocabulary as group_matches, so hyphenated and
+    # multi-word terms score the same here as in run_search
+    index = document['preprocessed_fuzzy_index' if use_preprocessing else 'fuzzy_index']
+    term_lower = term.lower()
+    pages = set()
+    for word, word_pages in index.items():
+        if fuzz.ratio(term_lower, word) >= threshold:
+            pages.update(word_pages)
+    return pages
+
+def evaluate_plan(pdf_path, terms, use_fuzzy=False, threshold=80, use_preprocessing=False, normalized_terms=None):
+    """Evaluate every question in the terms tree against one plan.
+
+    Each distinct term is resolved to the set of pages containing it once, via
+    the cached word index, so questions reduce to set unions and intersections
+    and the cost grows with the plan's pages rather than pages x questions.
+    With preprocessing, ``normalized_terms`` maps each term to its lemmas.
+    """
+    document = get_document(pdf_path, use_preprocessing)
+    if use_preprocessing and normalized_terms is None:
+        normalized_terms = normalize_terms(terms)
+    term_pages = {}
+    for questions in terms.values():
+        for term_sets in questions.values():
+            for group in term_sets:
+                for term in group:
+                    if term.strip() == "" or term in term_pages:
+                        continue
+                    if use_fuzzy and use_preprocessing:
+                        term_pages[term] = _fuzzy_term_pages(document, ' '.join(normalized_terms[term]), True, threshold)
+                    elif use_fuzzy:
+                        term_pages[term] = _fuzzy_term_pages(document, term, False, threshold)
+                    elif use_preprocessing:
+                        term_pages[term] = lemma_pages(document, normalized_terms[term])
+                    else:
+                        term_pages[term] = _exact_term_pages(document, term)
+
+    results = {}
+    for category, questions in terms.items():
+        for question, term_sets in questions.items():
+            groups = [[term for term in group if term.strip()] for group in term_sets]
+            pages = None
+            for group in groups:
+                group_pages = set().union(*(term_pages[term] for term in group))
+                pages = group_pages if pages is None else pages & group_pages
+            pages = pages or set()
+
+            # Rank pages by how many distinct terms they contain
+            all_terms = [term for group in groups for term in group]
+            ranked = sorted(pages, key=lambda i: (-sum(i in term_pages[term] for term in all_terms), i))
+            top_pages = ranked[:TOP_PAGES]
+            snippets = []
+            normalized = None
+            if use_preprocessing:
+                normalized = [[normalized_terms[term] for term in group] for group in groups]
+            for i in top_pages:
+                snippets.extend(page_snippets(document, i, term_sets, use_fuzzy, threshold, max_snippets=1,
+                                              normalized=normalized))
+            results[(category, question)] = {
+                'hits': len(pages),
+                'top_pages': top_pages,
+                'snippets': snippets,
+            }
+    return results
+
+def generate_report(pdf_paths, terms, use_fuzzy=False, threshold=80, use_preprocessing=False, max_workers=None,
+                    version=None):
+    """Evaluate the terms tree over several plans in parallel.
+
+    Returns ``(report, failures)``: report maps each plan that was evaluated to
+    {(category, question): result}, and failures maps each plan that could not
+    be read to its error message, so one bad PDF does not sink the whole run.
+    """
+    # Lemmatize the terms once here rather than in every worker
+    normalized_terms = normalize_terms(terms, version) if use_preprocessing else None
+    report = {}
+    failures = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {pdf_path: executor.submit(evaluate_plan, pdf_path, terms, use_fuzzy, threshold, use_preprocessing,
+                                             normalized_terms)
+                   for pdf_path in pdf_paths}
+        for pdf_path, future in futures.items():
+            try:
+                report[pdf_path] = future.result()
+            except Exception as e:
+                failures[pdf_path] = str(e) or type(e).__name__
+    return report, failures
+
+def _questions(terms):
+    return [(category, question) for category, questions in terms.items() for question in questions]
+
+def write_csv(report, terms, path):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Plan', 'Category', 'Question', 'Matching Pages', 'Top Pages', 'Snippets'])
+        for pdf_path, results in report.items():
+            for key in _questions(terms):
+                result = results[key]
+                writer.writerow([
+                    os.path.basename(pdf_path), key[0], key[1], result['hits'],
+                    ' '.join(str(i + 1) for i in result['top_pages']),
+                    ' | '.join(result['snippets']),
+                ])
+
+def write_html(report, terms, path, failures=None):
+    questions = _questions(terms)
+    rows = []
+    header = ''.join(f'<th title="{html.escape(category)}">{html.escape(question)}</th>'
+                     for category, question in questions)
+    rows.append(f'<tr><th>Plan</th>{header}</tr>')
+    for pdf_path, results in report.items():
+        cells = []
+        for key in questions:
+            result = results[key]
+            if not result['hits']:
+                cells.append('<td class="none">0</td>')
+                continue
+            details = ''.join(f'<li><b>p. {i + 1}</b> {html.escape(snippet)}</li>'
+                              for i, snippet in zip(result['top_pages'], result['snippets']))
+            cells.append(f'<td><details><summary>{result["hits"]}</summary><ul>{details}</ul></details></td>')
+        rows.append(f'<tr><th>{html.escape(os.path.basename(pdf_path))}</th>{"".join(cells)}</tr>')
+
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Cross-Plan Comparison</title>
+<style>
+body { font-family: 'Segoe UI', Arial, sans-serif; font-size: 10pt; }
+table { border-collapse: collapse; }
+th, td { border: 1px solid #999999; padding: 4px; vertical-align: top; }
+thead th, tr:first-child th { background-color: #0078d4; color: #ffffff; }
+td.none { color: #999999; }
+ul { margin: 4px 0; padding-left: 16px; max-width: 400px; }
+</style></head><body>
+<h1>Cross-Plan Comparison</h1>
+<p>Cells show the number of matching pages; expand a cell for the top pages and snippets.</p>
+<table>
+''')
+        f.write('\n'.join(rows))
+        f.write('\n</table>\n')
+        if failures:
+            items = ''.join(f'<li><b>{html.escape(os.path.basename(pdf_path))}</b>: {html.escape(error)}</li>'
+                            for pdf_path, error in failures.items())
+            f.write(f'<h2>Plans that could not be processed</h2>\n<ul>{items}</ul>\n')
+        f.write('</body></html>\n')
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare plans across every question in the terms file.')
+    parser.add_argument('pdfs', nargs='+')
+    parser.add_argument('--terms', default='data/terms.json', help='Terms JSON file')
+    parser.add_argument('--out', default='report', help='Output path without extension; writes .csv and .html')
+    parser.add_argument('--fuzzy', action='store_true', help='Use fuzzy matching')
+    parser.add_argument('--threshold', type=int, default=80, help='Fuzzy similarity threshold (50-100)')
+    parser.add_argument('--preprocessing', action='store_true', help='Match against preprocessed text')
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    terms = load_terms(args.terms)
+    report, failures = generate_report(args.pdfs, terms, args.fuzzy, args.threshold, args.preprocessing, args.workers,
+                                       terms_version(args.terms))
+    for pdf_path, error in failures.items():
+        print(f'Failed: {pdf_path}: {error}', file=sys.stderr)
+    write_csv(report, terms, args.out + '.csv')
+    write_html(report, terms, args.out + '.html', failures)
+    print(f'Wrote {args.out}.csv and {args.out}.html')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
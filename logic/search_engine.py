@@ -1,18 +1,8 @@
-import fitz  # PyMuPDF
 import re
 from thefuzz import fuzz
 
-try:
-    import spacy
-    nlp = spacy.load('en_core_web_sm')
-except (ImportError, OSError):
-    nlp = None
-
-def preprocess_text(text):
-    if nlp is None:
-        return text.lower()
-    doc = nlp(text.lower())
-    return ' '.join([token.lemma_ for token in doc if not token.is_stop and token.is_alpha])
+from logic.preprocessing import normalize_term_sets
+from logic.document_cache import get_document, get_pages, candidate_pages, lemma_pages
 
 def group_matches(text, group, use_fuzzy=False, threshold=80):
     for term in group:
@@ -28,20 +18,119 @@ def group_matches(text, group, use_fuzzy=False, threshold=80):
                 return True
     return False
 
-def search_pdf_for_terms(pdf_path, term_sets, use_fuzzy=False, fuzzy_threshold=80, use_preprocessing=False):
+def find_term_spans(text, term_sets, use_fuzzy=False, threshold=80):
+    spans = []
+    terms = [term for group in term_sets for term in group if term.strip()]
+    if use_fuzzy:
+        terms_lower = [term.lower() for term in terms]
+        for match in re.finditer(r"\b\w+\b", text):
+            word = match.group().lower()
+            if any(fuzz.ratio(term, word) >= threshold for term in terms_lower):
+                spans.append(match.span())
+    else:
+        for term in terms:
+            pattern = r"\b" + re.escape(term) + r"\b"
+            spans.extend(m.span() for m in re.finditer(pattern, text, flags=re.IGNORECASE))
+    return sorted(spans)
+
+def extract_snippets(text, spans, context=80, max_snippets=5):
+    """Build keyword-in-context snippets, merging windows that overlap."""
+    windows = []
+    for start, end in spans:
+        lo, hi = max(0, start - context), min(len(text), end + context)
+        if windows and lo <= windows[-1][1]:
+            windows[-1][1] = max(windows[-1][1], hi)
+        else:
+            windows.append([lo, hi])
+
+    snippets = []
+    for lo, hi in windows[:max_snippets]:
+        snippet = ' '.join(text[lo:hi].split())
+        if lo > 0:
+            snippet = '…' + snippet
+        if hi < len(text):
+            snippet = snippet + '…'
+        snippets.append(snippet)
+    return snippets
+
+def find_lemma_spans(tokens, offsets, normalized):
+    """Spans of raw words (or runs of words) whose lemmas match a normalized term.
+
+    ``tokens`` is a page's stored lemma sequence and ``offsets`` the raw
+    [start, end] of each lemma, both as built by the document cache.
+    """
+    by_first = {}
+    for group in normalized:
+        for lemmas in group:
+            if lemmas:
+                by_first.setdefault(lemmas[0], set()).add(lemmas)
+    if not by_first:
+        return []
+
+    spans = []
+    for j, lemma in enumerate(tokens):
+        for phrase in by_first.get(lemma, ()):
+            if tuple(tokens[j:j + len(phrase)]) == phrase:
+                spans.append((offsets[j][0], offsets[j + len(phrase) - 1][1]))
+    return spans
+
+def page_snippets(document, page, term_sets, use_fuzzy=False, threshold=80, context=80, max_snippets=5,
+                  normalized=None):
+    """Snippets for a matched page, always cut from its original (raw) text.
+
+    Pass the normalized term sets when matching ran on lemmas (the document must
+    then be preprocessed), so pages that only match an inflected form still get
+    snippets around that word.
+    """
+    raw_text = document['pages'][page]
+    spans = find_term_spans(raw_text, term_sets, use_fuzzy, threshold)
+    if normalized is not None and not use_fuzzy:
+        spans = sorted(spans + find_lemma_spans(document['preprocessed_tokens'][page],
+                                                document['preprocessed_offsets'][page], normalized))
+    if not spans:
+        spans = [(0, 0)]
+    return extract_snippets(raw_text, spans, context, max_snippets)
+
+def search_pdf_with_snippets(pdf_path, term_sets, use_fuzzy=False, fuzzy_threshold=80, use_preprocessing=False,
+                             snippet_context=80, max_snippets=5, terms_version=None):
     results = {}
-    doc = fitz.open(pdf_path)
-
-    for i in range(len(doc)):
-        page = doc.load_page(i)
-        text = page.get_text() or ""
-        if use_preprocessing:
-            text = preprocess_text(text)
-        lower_text = text.lower()
-        if all(group_matches(lower_text, group, use_fuzzy, fuzzy_threshold) for group in term_sets):
-            results[i] = text
-
-    doc.close()
+    snippets = {}
+    document = get_document(pdf_path, use_preprocessing)
+    raw_pages = document['pages']
+    pages = document['preprocessed'] if use_preprocessing else raw_pages
+
+    if use_preprocessing:
+        # Lemmatize the terms through the same pipeline as the page text
+        normalized = normalize_term_sets(term_sets, terms_version)
+
+    if use_fuzzy:
+        match_sets = [[' '.join(lemmas) for lemmas in group if lemmas] for group in normalized] if use_preprocessing else term_sets
+        page_numbers = [i for i in range(len(pages))
+                        if all(group_matches(pages[i].lower(), group, True, fuzzy_threshold) for group in match_sets)]
+    elif use_preprocessing:
+        matched = set(range(len(pages)))
+        for group in normalized:
+            matched &= set().union(*(lemma_pages(document, lemmas) for lemmas in group))
+        page_numbers = sorted(matched)
+    else:
+        page_numbers = [i for i in sorted(candidate_pages(pdf_path, term_sets))
+                        if all(group_matches(pages[i].lower(), group) for group in term_sets)]
+
+    for i in page_numbers:
+        results[i] = pages[i]
+        if not max_snippets:
+            continue
+        # Snippets are cut from the original page text so they stay readable
+        # even when matching ran against the preprocessed form.
+        snippets[i] = page_snippets(document, i, term_sets, use_fuzzy, fuzzy_threshold, snippet_context, max_snippets,
+                                    normalized if use_preprocessing else None)
+
+    return results, snippets
+
+def search_pdf_for_terms(pdf_path, term_sets, use_fuzzy=False, fuzzy_threshold=80, use_preprocessing=False,
+                         terms_version=None):
+    results, _ = search_pdf_with_snippets(pdf_path, term_sets, use_fuzzy, fuzzy_threshold, use_preprocessing,
+                                           max_snippets=0, terms_version=terms_version)
     return results
 
 def semantic_search_pdf(pdf_path, term_sets, threshold=0.5):
@@ -49,15 +138,11 @@ def semantic_search_pdf(pdf_path, term_sets, threshold=0.5):
         from sentence_transformers import SentenceTransformer, util
         model = SentenceTransformer('all-MiniLM-L6-v2')
         results = {}
-        doc = fitz.open(pdf_path)
         term_embeddings = [model.encode(' '.join(group), convert_to_tensor=True) for group in term_sets]
-        for i in range(len(doc)):
-            page = doc.load_page(i)
-            text = page.get_text() or ""
+        for i, text in enumerate(get_pages(pdf_path)):
             page_embedding = model.encode(text, convert_to_tensor=True)
             if all(util.cos_sim(page_embedding, term_emb).max() >= threshold for term_emb in term_embeddings):
                 results[i] = text
-        doc.close()
         return results
     except ImportError as e:
         print(f"Semantic search not available: {e}")
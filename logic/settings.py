@@ -2,6 +2,9 @@ import json
 import os
 from pathlib import Path
 
+# Per-user data: config, editable terms, document cache and the FTS index
+USER_DATA_DIR = os.path.join(os.path.expanduser("~"), "AppData", "Roaming", "EV-Search-Tool")
+
 SETTINGS_PATH = Path.home() / (
     ".config/pdf_keyword_tool/settings.json"
     if os.name != "nt"
@@ -1,3 +1,4 @@
+import hashlib
 import json
 import os
 import sys
@@ -12,3 +13,8 @@ def load_terms(json_path):
     full_path = resource_path(json_path)
     with open(full_path, "r") as f:
         return json.load(f)
+
+def terms_version(json_path):
+    """ Content hash of a terms file, used to key caches derived from its terms """
+    with open(resource_path(json_path), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -1,9 +1,11 @@
 from PyQt6.QtWidgets import QApplication
 from gui.main_window import MainWindow
+import multiprocessing
 import sys
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # ingestion workers in the frozen .exe
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()